@@ -1,24 +1,42 @@
 import random
 from typing import Optional
 import os
+import atexit
 import json
 import time
+import threading
+import weakref
 from time import monotonic, sleep
 from base64 import b32encode
 import re
 from io import StringIO, FileIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import quote, quote_from_bytes
 
 import requests
 from requests import request, RequestException
 from subprocess import Popen
 
+# orjson decodes the response bytes directly; stdlib json is the fallback when it isn't installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 vs = re.compile(r"[ ()\n]\$(\w+)[ ()\n]")
 
 def variables(pats):
     for pat in pats:
         yield from vs.search(pat).groups()
 
+@lru_cache(maxsize=256)
+def transform_payload(patterns, templates):
+    """
+    The `transform` command body for `patterns` and `templates`; rewrite rules are often re-applied, so it's memoized
+    """
+    return "(transform (, {}) (, {}))".format(" ".join(patterns), " ".join(templates))
+
 # One session per process
 requests_session = requests.Session()
 
@@ -39,14 +57,19 @@ class MORK:
             self.error = None
             self.server = None
             self.data = None
+            self._status_url = None
 
         def dispatch(self, server):
             """
             Send a request to the server
             """
             self.server = server
+            self._status_url = None
+            # A deferred clear must reach the server before anything that follows it; its failure belongs to its
+            # own scope (`clear_error`), not to this request
+            MORK.flush_clears(raise_errors=False)
             try:
-                self.response = requests_session.request(self.method, server.base + self.subdir, **self.kwargs)
+                self.response = server._request(self.method, server.base + self.subdir, **self.kwargs)
             except (RequestException, ConnectionError) as e:
                 self.error = e
                 raise e
@@ -62,10 +85,12 @@ class MORK:
                 raise RuntimeError(f"Must dispatch a request before it can be polled")
 
             # status_loc == subdir  or  status_loc == unique_id
-            status_response = requests_session.request("get", self.server.base + f"/status/{quote(self.status_loc)}", **self.kwargs)
+            if self._status_url is None:
+                self._status_url = self.server._status_url + quote(self.status_loc)
+            status_response = self.server._request("get", self._status_url, **self.kwargs)
             # print("poll status: ", status_response.text)
             if status_response and status_response.status_code == 200:
-                status_info = json.loads(status_response.text)
+                status_info = json_loads(status_response.content)
                 return_status = status_info['status']
                 if return_status == "pathForbiddenTemporary":
                     return (False, "")
@@ -94,32 +119,30 @@ class MORK:
                 attempt += 1
                 if attempt > max_attempts:
                     raise StopIteration
+            # Server-side work has settled, so earlier downloads may be stale
+            self.server._settled(self)
             return meta
 
         def listen(self):
-            from requests_sse import EventSource, InvalidStatusCodeError, InvalidContentTypeError
-
             """
             Listens to server side events on the status of a request.
+
+            Waits on a single `text/event-stream` response read through the server's session instead of polling.
             """
 
             url = self.server.base + f"/status_stream/{quote(self.status_loc)}"
 
-            def on_error():
-                raise Exception("error")
-
-            with EventSource(
-                url,
-                timeout=30,
-                on_error=on_error,
-            ) as event_source:
+            with self.server._request("get", url, stream=True, timeout=30, headers={"Accept": "text/event-stream"}) as event_stream:
+                event_stream.raise_for_status()
                 try:
                     print("listening...")
-                    for event in event_source:
-                        if event.data:
-                            msg = json.loads(event.data)
+                    for line in event_stream.iter_lines():
+                        if line.startswith(b"data:"):
+                            msg = json_loads(line[5:])
                             print("msg: ", msg)
                             if msg['status'] == "pathClear":
+                                # only a completed request settles; on a timeout or stream error it may still be running
+                                self.server._settled(self)
                                 return
 
                 except Exception as e:
@@ -242,7 +265,7 @@ class MORK:
         def __init__(self, patterns, templates):
             self.patterns = patterns
             self.templates = templates
-            self.payload = "(transform (, {}) (, {}))".format(" ".join(patterns), " ".join(templates))
+            self.payload = transform_payload(tuple(patterns), tuple(templates))
             self.status_loc = templates[0] #GOAT, is there a better location expr to use?
             super().__init__("post", f"/transform/", data=self.payload, headers={"Content-Type": "text/plain"})
 
@@ -254,11 +277,27 @@ class MORK:
         def dispatch(self, server):
             super().dispatch(server)
             if self.response and self.response.status_code == 200:
-                self.data = json.loads(self.response.text)
+                self.data = json_loads(self.response.content)
 
         def values(self):
             return [d["expr"] for d in self.data]
 
+        @staticmethod
+        def dispatch_level(server, level, max_workers=8):
+            """
+            Dispatch every not yet dispatched node of `level` concurrently over the server's session
+
+            Returns:
+                values: list, the `values()` of each node in order
+            """
+            pending = [n for n in level if n.data is None]
+            if len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+                    list(pool.map(lambda n: n.dispatch(server), pending))
+            else:
+                for n in pending: n.dispatch(server)
+            return [n.values() for n in level]
+
         def descend(self, i):
             return type(self)(self.pattern, quote_from_bytes(bytes(self.data[i]["token"])))
 
@@ -270,8 +309,7 @@ class MORK:
 
             frontier = [self]
             while True:
-                for c in frontier:
-                    c.dispatch(self.server)
+                self.dispatch_level(self.server, frontier)
                 yield frontier
                 frontier = [child for c in frontier for child in c._children()]
                 if not frontier:
@@ -317,7 +355,13 @@ class MORK:
             if location: self.status_loc = f"(exec {location})"
             super().__init__("get", f"/metta_thread/" if location is None else f"/metta_thread/?location={location}")
 
-    def __init__(self, base_url: Optional[str] = os.environ.get("MORK_URL"), namespace = "{}", finalization = (), parent=None, history=None):
+    # Scopes whose `and_clear` exit hasn't been sent yet; flushed before the next request or at interpreter exit
+    _pending_clears = []
+    # Held for a whole flush, so other threads' requests wait for the clears; re-entrant since `clear()` dispatches
+    _pending_lock = threading.RLock()
+    _flushing_thread = None
+
+    def __init__(self, base_url: Optional[str] = os.environ.get("MORK_URL"), namespace = "{}", finalization = (), parent=None, history=None, session: Optional[requests.Session] = None):
         if base_url is None:
             base_url = "http://127.0.0.1:8000"
         if isinstance(base_url, str):
@@ -328,6 +372,18 @@ class MORK:
         self.finalization = finalization
         self.parent = parent
         self.history = [] if history is None else history
+        # Falls back to the process-wide session; pass one in to control pooling and adapters
+        self.session = requests_session if session is None else session
+        # Bound once per scope, so building and sending a request doesn't walk back through the session and base url
+        self._request = self.session.request
+        self._status_url = self.base + "/status/"
+        # Scopes share their root's mutation counter; `download_` results are reused until it moves
+        self._root = self if parent is None else parent._root
+        if parent is None:
+            self._mut_counter = 0
+            self._mut_lock = threading.Lock()
+            self._unsettled = weakref.WeakSet()
+        self._dl_cache = None
 
         if parent is None:
             status_req = self.Status("-")
@@ -370,7 +426,7 @@ class MORK:
         """
         cmd = self.Transform(tuple(map(self.ns.format, patterns)), tuple(map(self.ns.format, templates)))
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
     def upload_(self, data):
@@ -388,14 +444,27 @@ class MORK:
         io = self.ns.format(template)
         cmd = self.Upload(pattern, io, data)
         self.history.append(cmd)
+        self._mutated()
         cmd.dispatch(self)
         return cmd
 
     def download_(self, max_results=None):
         """
         Download everything in the scope
-        """
-        return self.download("$x", "$x", max_results)
+
+        Repeated calls return the previous request until something writes to the space through this client.  While a
+        transform, import, exec or clear from this connection hasn't been waited on with `block` or `listen`, every
+        call goes to the server (so fire-and-forget writes such as an unawaited `query` leave the cache off).  Writes
+        made through other connections or clients are not seen by the cache.
+        """
+        root = self._root
+        counter = root._mut_counter
+        if self._dl_cache is not None and not root._unsettled and self._dl_cache[:2] == (counter, max_results):
+            return self._dl_cache[2]
+        cmd = self.download("$x", "$x", max_results)
+        if cmd.data is not None:
+            self._dl_cache = (counter, max_results, cmd)
+        return cmd
 
     def download(self, pattern, template, max_results=None):
         """
@@ -444,7 +513,7 @@ class MORK:
         io = self.ns.format(template)
         cmd = self.Import(pattern, io, file_uri)
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
     def csv_import_(self, file_uri):
@@ -457,7 +526,7 @@ class MORK:
         io = self.ns.format(template)
         cmd = self.Import(pattern, io, file_uri, fileformat="csv")
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
     def paths_import_(self, file_uri):
@@ -470,7 +539,7 @@ class MORK:
         io = self.ns.format(template)
         cmd = self.Import(pattern, io, file_uri, fileformat="paths")
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
     def clear(self):
@@ -480,7 +549,7 @@ class MORK:
         io = self.ns.format("$x")
         cmd = self.Clear(io)
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
     def explore_(self):
@@ -496,16 +565,123 @@ class MORK:
         """
         cmd = self.Exec(self.ns.format(thread_id))
         self.history.append(cmd)
-        cmd.dispatch(self)
+        self._dispatch_tracked(cmd)
         return cmd
 
+    def _mutated(self):
+        """
+        Record that the space may have changed, invalidating cached downloads in every scope of this connection
+        """
+        root = self._root
+        with root._mut_lock:
+            root._mut_counter += 1
+
+    def _track(self, cmd):
+        """
+        Record a write whose server-side work outlives its dispatch; downloads bypass the cache until it has settled
+        """
+        root = self._root
+        with root._mut_lock:
+            root._unsettled.add(cmd)
+            root._mut_counter += 1
+
+    def _dispatch_tracked(self, cmd):
+        self._track(cmd)
+        try:
+            cmd.dispatch(self)
+        except BaseException:
+            # nothing reached the server, so there is nothing to wait for
+            self._settled(cmd)
+            raise
+
+    def _settled(self, cmd):
+        root = self._root
+        with root._mut_lock:
+            root._unsettled.discard(cmd)
+            root._mut_counter += 1
+
+    def _defer_clear(self):
+        self.clear_error = None
+        with MORK._pending_lock:
+            MORK._pending_clears.append(self)
+        self._mutated()
+
+    def _within(self, other):
+        """
+        Whether this scope's subspace lies inside `other`'s, i.e. its namespace fills `other`'s `{}` with an expression
+        """
+        if self.base != other.base or len(self.ns) <= len(other.ns): return False
+        pre, _, post = other.ns.partition("{}")
+        inner = self.ns[len(pre):len(self.ns) - len(post)]
+        return self.ns.startswith(pre) and self.ns.endswith(post) and inner.startswith("(") and inner.endswith(")")
+
+    @classmethod
+    def flush_clears(cls, raise_errors=True):
+        """
+        Send the clears deferred by exiting `and_clear` scopes, skipping scopes nested inside another pending one
+
+        A failed clear is stored on its scope as `clear_error` and the remaining clears are still sent; afterwards the
+        first failure is raised, or with `raise_errors=False` each one is printed instead
+        """
+        # A scope stays queued until its clear has completed, so an empty queue means nothing is in flight
+        if not cls._pending_clears or cls._flushing_thread == threading.get_ident(): return
+        with cls._pending_lock:
+            cls._flushing_thread = threading.get_ident()
+            errors = []
+            try:
+                while cls._pending_clears:
+                    scope = cls._pending_clears[0]
+                    try:
+                        if not any(scope._within(other) for other in cls._pending_clears[1:]):
+                            scope.clear().block()
+                    except Exception as e:
+                        scope.clear_error = e
+                        errors.append(e)
+                        if not raise_errors: print(f"on deferred clear of {scope.ns.format('$x')}:", repr(e))
+                    finally:
+                        cls._pending_clears.pop(0)
+            finally:
+                cls._flushing_thread = None
+        if errors and raise_errors:
+            raise errors[0]
+
     def work_at(self, name=None, finalization=(), **kwargs):
         """
         Creates a new scoped subspace to work inside of
         """
         name = b32encode(random.randbytes(6)) if name is None else name
         ns = kwargs.pop("namespace") if "namespace" in kwargs else self.ns.format(f"({name} {{}})")
-        return MORK(namespace=ns, finalization=finalization, parent=self, history=self.history, base_url=self.base, **kwargs)
+        return MORK(namespace=ns, finalization=finalization, parent=self, history=self.history, base_url=self.base, session=self.session, **kwargs)
+
+    def wait_idle(self, timeout=5.0, delay=0.01):
+        """
+        Poll the status of the scoped subspace until no in-flight request holds it
+
+        Raises TimeoutError if it is still busy after `timeout` seconds
+        """
+        deadline = monotonic() + timeout
+        while True:
+            status_req = self.Status(self.ns.format("$x"))
+            status_req.dispatch(self)
+            if status_req.data is None:
+                raise ConnectionError(f"Failed to get status from MORK server at {self.base}")
+            if json_loads(status_req.data)['status'] != "pathForbiddenTemporary":
+                return
+            if monotonic() > deadline:
+                raise TimeoutError(f"{self.ns.format('$x')} still busy after {timeout} s")
+            sleep(delay)
+
+    def scoped(self, finalization=()):
+        """
+        Creates a scope over this same subspace that reuses the connection (no status handshake), with its own history
+        """
+        return MORK(namespace=self.ns, finalization=finalization, parent=self, base_url=self.base, session=self.session)
+
+    def scoped_clear(self):
+        """
+        Like `scoped`, but the subspace is cleared when exiting the `with` block
+        """
+        return self.scoped().and_clear()
 
     def __enter__(self):
         # io = self.ns.format("$x")
@@ -516,7 +692,7 @@ class MORK:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         if "time" in self.finalization: print(f"{self.ns.format('*')} time {monotonic() - self.t0:.6f} s")
-        if "clear" in self.finalization: self.clear().block()
+        if "clear" in self.finalization: self._defer_clear()
         if "spin_down" in self.finalization:
             try: self.spin_down()
             except requests.ConnectionError as e: print("on spin down:", e)
@@ -547,6 +723,8 @@ class MORK:
     def and_clear(self):
         """
         Calling this method will cause the expression subspace to be cleared when exiting the `with` block
+
+        The clear is sent ahead of the next request made by any scope (or at interpreter exit), not at the exit itself
         """
         self.finalization += ("clear",)
         return self
@@ -557,13 +735,21 @@ class MORK:
         return self
 
     def _bare(self) -> 'MORK':
-        return _BareMORK(self.base, self.ns)
+        return _BareMORK(self.base, self.ns, self.session)
 
 class _BareMORK(MORK):
-    def __init__(self, base, ns):
+    def __init__(self, base, ns, session=requests_session):
         self.base = base
         self.ns = ns
         self.history = []
+        self.session = session
+        self._request = session.request
+        self._status_url = base + "/status/"
+        self._root = self
+        self._mut_counter = 0
+        self._mut_lock = threading.Lock()
+        self._unsettled = weakref.WeakSet()
+        self._dl_cache = None
 
 class ManagedMORK(MORK):
     """
@@ -673,7 +859,11 @@ class ManagedMORK(MORK):
                 print(exc_type, exc_val, "caused terminate")
             #Shut down the server if we started it
             if self.process is not None:
-                self.process.terminate()
+                try: self.flush_clears()
+                except Exception as e: print("on clear before terminate:", e)
+                finally: self.process.terminate()
+
+atexit.register(MORK.flush_clears, raise_errors=False)
 
 def _main():
     # smoke test
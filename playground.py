@@ -25,26 +25,72 @@ This is intentionally verbose so you can learn what each step does.
 """
 
 import csv
-import time
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from client import MORK
 
 BASE_URL = "http://127.0.0.1:8000"
 
+# One pooled keep-alive session shared by every demo's MORK client
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0))
+
+_BAR = "=" * 40
+_RULE = "-" * 40
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+# Parse plain `key,value` CSV with bytes.split; set to False to always go through csv.reader
+FAST_CSV = True
+
 # ---------- Helpers ----------
 
+def _client():
+    """The playground's single MORK connection, created (with its GET /status/- handshake) on first use.
+
+    Demos work through `_client().scoped()` so each gets its own request history, dropped when the demo ends.
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = MORK(base_url=BASE_URL, session=_SESSION)
+    return _CLIENT
+
+
 def safe_print(title, payload):
-    print("\n" + "=" * 40)
-    print(title)
-    print("-" * 40)
-    if payload is None:
-        print("(None)")
-    else:
-        # If object has .data like requests-style response wrapper in the client, print that
-        try:
-            print(payload.data)
-        except Exception:
-            print(payload)
-    print("=" * 40 + "\n")
+    # If object has .data like requests-style response wrapper in the client, print that
+    body = "(None)" if payload is None else getattr(payload, "data", payload)
+    # one write per banner, so banners from concurrent demos don't interleave
+    sys.stdout.write(f"\n{_BAR}\n{title}\n{_RULE}\n{body}\n{_BAR}\n\n")
+
+
+@lru_cache(maxsize=4)
+def _csv_to_sexpr(path, mtime_ns, fast=True):
+    """Convert `key,value` CSV rows to an s-expr upload body; keyed on mtime so edits to the file are picked up."""
+    with open(path, "rb") as f:
+        data = f.read()
+    # create expressions like (foo 1)
+    if fast and b'"' not in data:
+        rows = [ln.split(b",") for ln in data.splitlines() if ln]
+        if all(len(row) == 2 for row in rows):
+            return b"".join([b"(%s %s)\n" % (k, v) for k, v in rows])
+    # quoted fields or ragged rows: let csv.reader handle the dialect; the bound format is looked up once
+    fmt = "({} {})\n".format
+    out = io.StringIO()
+    write = out.write
+    for row in csv.reader(io.StringIO(data.decode(), newline="")):
+        if row:
+            write(fmt(row[0], row[1]))
+    return out.getvalue().encode()
 
 
 # ---------- Demos ----------
@@ -52,15 +98,15 @@ def safe_print(title, payload):
 def demo_1_connect_and_status():
     """1) Connect to the server and check that it accepts our status request."""
     print("Demo 1: connect and status")
-    with MORK(base_url=BASE_URL) as server:
-        # The client performs a GET /status/- during init; if we are here, connection succeeded.
+    with _client().scoped() as server:
+        # The client performs a GET /status/- when first created; if we are here, connection succeeded.
         safe_print("Connected. Current download() of server:", server.download_())
 
 
 def demo_2_upload_and_download():
-    """2) Upload a few s-expr lines and download them back."""
+    """2) Upload a few s-expr lines and download them back (inside its own workspace)."""
     print("Demo 2: upload and download")
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped().work_at("demo2").and_clear() as server:
         server.upload_("(foo 1)\n(foo 2)\n(bar 3)")
         # download everything in this scope
         out = server.download_()
@@ -70,74 +116,69 @@ def demo_2_upload_and_download():
 def demo_3_csv_import_via_python():
     """3) Import CSV by converting rows to s-expr and upload (client has no csv_import method)."""
     print("Demo 3: csv -> upload_")
-    with MORK(base_url=BASE_URL).and_clear() as server:
-        rows = []
-        with open("test.csv") as f:
-            r = csv.reader(f)
-            for row in r:
-                # create expressions like (foo 1)
-                rows.append(f"({row[0]} {row[1]})")
-        server.upload_("\n".join(rows))
+    with _client().scoped().work_at("demo3").and_clear() as server:
+        # re-running the demo on an unchanged file reuses the converted payload
+        payload = _csv_to_sexpr("test.csv", os.stat("test.csv").st_mtime_ns, FAST_CSV)
+        server.upload_(payload)
         safe_print("Uploaded CSV rows as s-expr; server.download():", server.download_())
 
 
 def demo_4_transform_simple():
-    """4) Apply a transform: change (foo $x) -> (baz $x). Use .block() to wait for completion."""
+    """4) Apply a transform: change (foo $x) -> (baz $x). Use .listen() to wait for completion."""
     print("Demo 4: transform (foo $x) -> (baz $x)")
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped_clear() as server:
         server.upload_("(foo 1)\n(foo 2)\n(bar 5)")
         # Request transform; pattern and template lists can have multiple items.
         t = server.transform(("(foo $x)",), ("(baz $x)",))
-        # block() polls until transform is finished
-        t.block()
+        # listen() waits on the server's status event stream until the transform is finished
+        t.listen()
         safe_print("After transform, download():", server.download_())
 
 
 def demo_5_nested_workspaces_and_clear():
     """5) Show work_at() isolating data and .and_clear() to auto-clear at exit."""
     print("Demo 5: nested workspaces")
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped().work_at("demo5").and_clear() as server:
         server.upload_("(global 1)")
         with server.work_at("inner").and_clear() as inner:
             inner.upload_("(inner 1)")
             safe_print("Inner workspace download:", inner.download_())
             safe_print("Parent download (should not contain inner scope):", server.download_())
-        # after exiting inner, inner was auto-cleared
+        # after exiting inner, its clear is queued and sent ahead of this download
         safe_print("After inner cleared, parent download():", server.download_())
 
 
 def demo_6_explore_values_and_levels():
     """6) Use explore_() to examine values and traverse levels."""
     print("Demo 6: explore_")
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped_clear() as server:
         server.upload_("(animal cat)\n(animal dog)\n(color red)\n(color blue)")
         explorer = server.explore_()
-        # explorer.dispatch() happens inside levels() iteration in the client; we print values per level
+        # levels() dispatches each level's nodes together; dispatch_level() then only collects their values
         for level_idx, level in enumerate(explorer.levels()):
             print(f"Level {level_idx} values:")
-            for node in level:
-                node.dispatch(server)
-                print("  ", node.values())
+            for values in explorer.dispatch_level(server, level):
+                print("  ", values)
 
 
 def demo_7_exec_thread_and_transform_exec():
     """7) Run a small MM2-style exec flow: upload exec specs, transform them into a named thread, run it."""
     print("Demo 7: exec flow")
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped_clear() as server:
         # The server's exec/methods are meta — this is a canonical example from your original code
         server.upload_("(_exec 0 (, (data (foo $x))) (, (data (bar $x))))")
         # transform the generic _exec into a concrete named exec thread
-        server.transform(("(_exec $priority $p $t)",), ("(exec (test $priority) $p $t)",)).block()
+        server.transform(("(_exec $priority $p $t)",), ("(exec (test $priority) $p $t)",)).listen()
         # run the exec thread called 'test'
         server.exec(thread_id="test").listen()
         safe_print("After exec, server.download():", server.download_())
 
 
 def demo_8_import_from_url_and_listen():
-    """8) Import s-expressions from a remote URL (if server supports it) and listen to status events."""
+    """8) Import s-expressions from a remote URL (if server supports it) into its own workspace and listen to status events."""
     print("Demo 8: sexpr_import_ from URL")
     example_url = "https://raw.githubusercontent.com/trueagi-io/metta-examples/refs/heads/main/aunt-kg/simpsons.metta"
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped().work_at("demo8").and_clear() as server:
         # sexpr_import_ will return a Request object; calling .listen() waits for completion via SSE
         # (Note: this requires the server to support streaming status updates)
         try:
@@ -151,7 +192,7 @@ def demo_9_export_to_file():
     """9) Export the current scope to a local file URI (server must support file:// or tmp writer)."""
     print("Demo 9: sexpr_export to file (if supported by server)")
     out_uri = "file:///tmp/mork_export.metta"
-    with MORK(base_url=BASE_URL).and_clear() as server:
+    with _client().scoped_clear() as server:
         server.upload_("(a 1)\n(b 2)")
         try:
             server.sexpr_export_(out_uri).block()
@@ -166,7 +207,7 @@ def demo_10_clear_and_stop_server():
     Note: stop() will instruct the mork_server to terminate; use with caution on a dev server.
     """
     print("Demo 10: clear() and stop() (stop commented out by default)")
-    with MORK(base_url=BASE_URL) as server:
+    with _client().scoped() as server:
         server.upload_("(will be cleared)")
         safe_print("Before clear, download():", server.download_())
         server.clear().block()
@@ -179,7 +220,7 @@ def demo_10_clear_and_stop_server():
 def demo_11_history_and_inspect_requests():
     """11) Show the stored `history` list of Request objects created during the session."""
     print("Demo 11: request history")
-    with MORK(base_url=BASE_URL) as server:
+    with _client().scoped().work_at("demo11").and_clear() as server:
         server.upload_("(h 1)")
         server.download_()
         # history contains Request objects in order created
@@ -188,45 +229,79 @@ def demo_11_history_and_inspect_requests():
 
 
 def demo_12_concurrent_playground_small_pool():
-    """12) Example showing how you might run multiple isolated workspaces sequentially (simple loop).
+    """12) Example showing how you might run multiple isolated workspaces concurrently (small thread pool).
 
     Note: Multiprocessing with the server is possible but can complicate logs and process ownership of server binary.
-    This demo keeps it simple: create 4 isolated workspaces sequentially to show namespace isolation.
+    The work here is IO-bound, so threads sharing the pooled session are enough: each of the 4 workspaces is
+    namespace-isolated on the server, so their upload/download pairs can run at the same time.
     """
-    print("Demo 12: multiple isolated workspaces (sequential)")
-    with MORK(base_url=BASE_URL) as server:
-        for i in range(4):
-            ns_name = f"play{i}"
-            with server.work_at(ns_name).and_clear() as w:
+    print("Demo 12: multiple isolated workspaces (thread pool)")
+    with _client().scoped().work_at("demo12").and_clear() as server:
+        def run_ns(i):
+            with server.work_at(f"play{i}").and_clear() as w:
                 w.upload_(f"(in {i})\n(value {i * 10})")
-                safe_print(f"workspace {ns_name} contents:", w.download_())
+                return w.download_()
+
+        # _SESSION's pool_maxsize (20) leaves a socket per worker
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(run_ns, range(4)))
+        for i, out in enumerate(results):
+            safe_print(f"workspace play{i} contents:", out)
         safe_print("Parent scope (should not include inner playN items):", server.download_())
 
 
 # ---------- Runner ----------
 
+def run_demo(demo):
+    try:
+        demo()
+    except Exception as e:
+        print(f"Demo {demo.__name__} failed:", e)
+
+
+# These demos only touch their own work_at() namespace, so they can overlap on the shared session
+_INDEPENDENT_DEMOS = (
+    demo_2_upload_and_download,
+    demo_3_csv_import_via_python,
+    demo_5_nested_workspaces_and_clear,
+    demo_8_import_from_url_and_listen,
+    demo_11_history_and_inspect_requests,
+    demo_12_concurrent_playground_small_pool,
+)
+# These work on the root space (and demo 10 clears all of it), so they run one after another afterwards
+_SERIAL_DEMOS = (
+    demo_4_transform_simple,
+    demo_6_explore_values_and_levels,
+    demo_7_exec_thread_and_transform_exec,
+    demo_9_export_to_file,
+    demo_10_clear_and_stop_server,
+)
+
+
+def wait_for_server(after):
+    try:
+        _client().wait_idle()
+    except Exception as e:
+        print(f"Server not idle after {after}:", e)
+
+
 def run_all():
-    demos = [
-        demo_1_connect_and_status,
-        demo_2_upload_and_download,
-        demo_3_csv_import_via_python,
-        demo_4_transform_simple,
-        demo_5_nested_workspaces_and_clear,
-        demo_6_explore_values_and_levels,
-        demo_7_exec_thread_and_transform_exec,
-        demo_8_import_from_url_and_listen,
-        demo_9_export_to_file,
-        demo_10_clear_and_stop_server,
-        demo_11_history_and_inspect_requests,
-        demo_12_concurrent_playground_small_pool,
-    ]
-
-    for demo in demos:
+    try:
+        # demo 1 opens the shared connection before the concurrent demos start using it
+        run_demo(demo_1_connect_and_status)
+        with ThreadPoolExecutor(max_workers=len(_INDEPENDENT_DEMOS)) as pool:
+            list(pool.map(run_demo, _INDEPENDENT_DEMOS))
+        # e.g. demo 8's import may still be writing if its listen() gave up; the root-space demos clear everything
+        wait_for_server("the concurrent demos")
+        for demo in _SERIAL_DEMOS:
+            run_demo(demo)
+            # start the next root-space demo once the server has settled this one's work
+            wait_for_server(demo.__name__)
+    finally:
         try:
-            demo()
-        except Exception as e:
-            print(f"Demo {demo.__name__} failed:", e)
-        time.sleep(0.35)
+            MORK.flush_clears()
+        finally:
+            _SESSION.close()
 
 
 if __name__ == "__main__":